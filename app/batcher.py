@@ -0,0 +1,108 @@
+"""Micro-batching of concurrent LLM requests."""
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+
+
+class PromptBatcher:
+    """
+    Group prompts that arrive close together and send them as one batch.
+
+    The first prompt opens a short collection window; everything submitted
+    before it closes is dispatched together with asyncio.gather, so a burst
+    of uploads reaches the LLM server's parallel slots at once. A batch
+    that fills up to batch_size goes out immediately instead of waiting
+    for the window to close. Each caller awaits its own future, resolved when its
+    response comes back.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[Any], Awaitable[str]],
+        batch_size: int = 8,
+        timeout: float = 0.05
+    ):
+        """
+        Initialize the batcher.
+
+        Args:
+            send: Coroutine function that sends a single request
+            batch_size: Maximum number of requests dispatched together
+            timeout: Collection window in seconds, started by the first request
+        """
+        self._send = send
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._in_flight: Set[asyncio.Task] = set()
+
+    async def submit(self, request: Any) -> str:
+        """
+        Queue a request and wait for its response.
+
+        Args:
+            request: Request passed through to the send function
+
+        Returns:
+            Response returned by the send function
+
+        Raises:
+            Exception: Whatever the send function raised for this request
+        """
+        loop = asyncio.get_running_loop()
+        self._ensure_worker(loop)
+
+        future = loop.create_future()
+        self._queue.put_nowait((request, future))
+        return await future
+
+    def _ensure_worker(self, loop: asyncio.AbstractEventLoop):
+        """Start the collector task on the running loop if needed."""
+        # Queues and tasks are bound to one event loop; rebuild them when a
+        # new loop starts submitting (e.g. a fresh asyncio.run in the CLI).
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._collect())
+
+    async def _collect(self):
+        """Drain the queue into batches and dispatch them."""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.timeout
+
+            while len(batch) < self.batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Dispatch in the background so the next window can start collecting
+            task = asyncio.create_task(self._dispatch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _dispatch(self, batch: List[Tuple[Any, asyncio.Future]]):
+        """Send a batch concurrently and resolve each caller's future."""
+        results = await asyncio.gather(
+            *(self._send(request) for request, _ in batch),
+            return_exceptions=True
+        )
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
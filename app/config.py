@@ -10,9 +10,22 @@ load_dotenv()
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
     
+    # LLM Backend: "ollama" or "llamacpp"
+    llm_backend: str = os.getenv("LLM_BACKEND", "ollama")
+    
     # Ollama Configuration
     ollama_base_url: str = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
     ollama_model: str = os.getenv("OLLAMA_MODEL", "llama3")
+    ollama_num_parallel: int = int(os.getenv("OLLAMA_NUM_PARALLEL", "8"))
+    
+    # llama.cpp Configuration (llama-server)
+    llamacpp_base_url: str = os.getenv("LLAMACPP_BASE_URL", "http://localhost:8080")
+    llamacpp_model: str = os.getenv("LLAMACPP_MODEL", "llama3")
+    llamacpp_parallel: int = int(os.getenv("LLAMACPP_PARALLEL", "4"))
+    
+    # LLM Request Batching
+    llm_batch_size: int = int(os.getenv("LLM_BATCH_SIZE", "8"))
+    llm_batch_timeout_ms: int = int(os.getenv("LLM_BATCH_TIMEOUT_MS", "50"))
     
     # Extraction Mode
     extraction_mode: str = os.getenv("EXTRACTION_MODE", "llm")
@@ -23,6 +36,11 @@ class Settings(BaseSettings):
     
     # OCR Configuration
     tesseract_cmd: str = os.getenv("TESSERACT_CMD", "/usr/bin/tesseract")
+    pdftocairo_cmd: str = os.getenv("PDFTOCAIRO_CMD", "pdftocairo")
+    ocr_dpi: int = int(os.getenv("OCR_DPI", "200"))
+    
+    # Logging
+    log_level: str = os.getenv("LOG_LEVEL", "WARNING")
     
     model_config = ConfigDict(env_file=".env")
 
@@ -0,0 +1,76 @@
+"""msgspec mirrors of the extraction schemas, used when encoding for storage."""
+from typing import List, Optional
+import msgspec
+from app.schema import ExtractedData
+
+
+class LineItemMsg(msgspec.Struct):
+    """msgspec mirror of schema.LineItem."""
+    description: str
+    quantity: Optional[float] = None
+    unit_price: Optional[float] = None
+    total: Optional[float] = None
+
+
+class ExtractedDataMsg(msgspec.Struct):
+    """msgspec mirror of schema.ExtractedData; keep the fields in the same order."""
+    doc_type: str
+    vendor: Optional[str] = None
+    invoice_number: Optional[str] = None
+    invoice_date: Optional[str] = None
+    total_amount: Optional[float] = None
+    currency: Optional[str] = "USD"
+    line_items: List[LineItemMsg] = msgspec.field(default_factory=list)
+
+
+_ENC = msgspec.json.Encoder()
+
+
+def encode_extracted(extracted_data: ExtractedData) -> bytes:
+    """
+    Encode validated extracted data as JSON.
+
+    The model's attributes are copied straight into the msgspec structs,
+    skipping model_dump(), and msgspec renders the JSON. The output is
+    byte-for-byte what model_dump_json() produces.
+
+    Args:
+        extracted_data: Validated ExtractedData
+
+    Returns:
+        Compact JSON bytes
+    """
+    return _ENC.encode(ExtractedDataMsg(
+        doc_type=extracted_data.doc_type,
+        vendor=extracted_data.vendor,
+        invoice_number=extracted_data.invoice_number,
+        invoice_date=extracted_data.invoice_date,
+        total_amount=extracted_data.total_amount,
+        currency=extracted_data.currency,
+        line_items=[
+            LineItemMsg(
+                description=item.description,
+                quantity=item.quantity,
+                unit_price=item.unit_price,
+                total=item.total
+            )
+            for item in extracted_data.line_items
+        ]
+    ))
+
+
+def pretty_json(data: bytes) -> bytes:
+    """
+    Re-indent compact JSON for display or JSON files.
+
+    msgspec reformats the bytes directly instead of decoding them into
+    Python objects and encoding them again. For encode_extracted() output
+    the result matches model_dump_json(indent=2).
+
+    Args:
+        data: Compact JSON bytes
+
+    Returns:
+        JSON bytes indented by two spaces
+    """
+    return msgspec.json.format(data, indent=2)
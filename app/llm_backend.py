@@ -0,0 +1,175 @@
+"""Chat-completion backends for the LLM extractor (Ollama, llama.cpp)."""
+from abc import ABC, abstractmethod
+import httpx
+from typing import Any, Dict, List, Optional
+from app.config import settings
+
+
+class LLMBackend(ABC):
+    """Base class for HTTP chat backends that support JSON-schema output."""
+
+    name = "llm"
+    label = "LLM"
+    endpoint = ""
+
+    def __init__(self, base_url: str, model: str, max_parallel: int = 8):
+        """
+        Initialize the backend.
+
+        Args:
+            base_url: Server URL without a trailing path
+            model: Model name sent with each request
+            max_parallel: Most requests in flight at once; match the
+                number of parallel slots the server is configured with
+        """
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        # One async client per backend so concurrent requests reuse pooled
+        # connections, capped at what this server can run in parallel
+        self._http_client = httpx.AsyncClient(
+            timeout=60,
+            limits=httpx.Limits(max_connections=max_parallel),
+        )
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        schema: Dict[str, Any],
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """
+        Send a chat request and return the generated message content.
+
+        Args:
+            messages: Chat messages, system prompt first
+            schema: JSON schema the output is constrained to
+            max_tokens: Optional cap on generated tokens
+
+        Returns:
+            Generated text response
+
+        Raises:
+            Exception: If API call fails
+        """
+        url = f"{self.base_url}{self.endpoint}"
+        payload = self._build_payload(messages, schema, max_tokens)
+
+        try:
+            response = await self._http_client.post(url, json=payload)
+            response.raise_for_status()
+
+            return self._parse_content(response.json())
+        except httpx.HTTPError as e:
+            raise Exception(f"{self.label} API call failed: {str(e)}")
+
+    async def aclose(self):
+        """Close the backend's pooled HTTP connections."""
+        await self._http_client.aclose()
+
+    @abstractmethod
+    def _build_payload(
+        self,
+        messages: List[Dict[str, str]],
+        schema: Dict[str, Any],
+        max_tokens: Optional[int]
+    ) -> Dict[str, Any]:
+        """Build the server-specific request body."""
+
+    @abstractmethod
+    def _parse_content(self, result: Dict[str, Any]) -> str:
+        """Pull the generated message content out of a response body."""
+
+
+class OllamaBackend(LLMBackend):
+    """Ollama's native /api/chat endpoint."""
+
+    name = "ollama"
+    label = "Ollama"
+    endpoint = "/api/chat"
+
+    def _build_payload(self, messages, schema, max_tokens):
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "stream": False,
+            "format": schema
+        }
+        if max_tokens is not None:
+            payload["options"] = {"num_predict": max_tokens}
+
+        return payload
+
+    def _parse_content(self, result):
+        return result.get("message", {}).get("content", "")
+
+
+class LlamaCppBackend(LLMBackend):
+    """llama.cpp's llama-server via its OpenAI-compatible chat endpoint."""
+
+    name = "llamacpp"
+    label = "llama.cpp"
+    endpoint = "/v1/chat/completions"
+
+    def _build_payload(self, messages, schema, max_tokens):
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "stream": False,
+            "response_format": {"type": "json_object", "schema": schema},
+            # Reuse the KV cache for the shared system prompt prefix
+            "cache_prompt": True
+        }
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+
+        return payload
+
+    def _parse_content(self, result):
+        choices = result.get("choices") or [{}]
+        return choices[0].get("message", {}).get("content", "")
+
+
+# Shared instance, created on first use so an invalid LLM_BACKEND only
+# fails when the LLM is actually needed (rules mode never touches it)
+_backend: Optional[LLMBackend] = None
+
+
+def get_backend() -> LLMBackend:
+    """
+    Return the shared backend selected by the LLM_BACKEND setting.
+
+    Returns:
+        Configured LLMBackend, created on first call
+
+    Raises:
+        ValueError: If LLM_BACKEND names an unknown backend
+    """
+    global _backend
+
+    if _backend is None:
+        _backend = _create_backend()
+
+    return _backend
+
+
+async def close_backend():
+    """Close the shared backend's client if it was created; the next get_backend() recreates it."""
+    global _backend
+
+    if _backend is not None:
+        backend, _backend = _backend, None
+        await backend.aclose()
+
+
+def _create_backend() -> LLMBackend:
+    """Build the backend named by LLM_BACKEND."""
+    if settings.llm_backend == "ollama":
+        return OllamaBackend(
+            settings.ollama_base_url, settings.ollama_model, settings.ollama_num_parallel
+        )
+    elif settings.llm_backend == "llamacpp":
+        return LlamaCppBackend(
+            settings.llamacpp_base_url, settings.llamacpp_model, settings.llamacpp_parallel
+        )
+
+    raise ValueError(f"Invalid LLM backend: {settings.llm_backend}")
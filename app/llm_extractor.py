@@ -1,15 +1,25 @@
-"""LLM-based structured extraction using Ollama."""
-import json
+"""LLM-based structured extraction using Ollama or llama.cpp."""
+import logging
 import re
-import requests
-from typing import Dict, Any, Optional
+from collections import Counter
+from typing import Dict, List, Optional
+from pydantic import ValidationError
 from app.config import settings
 from app.schema import ExtractedData
+from app.batcher import PromptBatcher
+from app.llm_backend import get_backend
 
+try:
+    import hyperscan
+except ImportError:  # optional accelerator for the rules extractor
+    hyperscan = None
 
-def extract_with_llm(text: str) -> ExtractedData:
+logger = logging.getLogger(__name__)
+
+
+async def extract_with_llm(text: str) -> ExtractedData:
     """
-    Extract structured data from text using Ollama LLM.
+    Extract structured data from text using the configured LLM backend.
     
     Args:
         text: Cleaned text to extract from
@@ -22,14 +32,14 @@ def extract_with_llm(text: str) -> ExtractedData:
     """
     prompt = _build_extraction_prompt(text)
     
-    # Call Ollama API
-    response = _call_ollama(prompt)
-    
-    # Parse JSON from response
-    extracted_json = _parse_json_response(response)
+    # Call the LLM backend
+    response = await _batcher.submit(prompt)
     
-    # Validate and return as ExtractedData
-    return ExtractedData(**extracted_json)
+    # Decoding is constrained to the schema, so parse and validate directly
+    try:
+        return ExtractedData.model_validate_json(response)
+    except ValidationError as e:
+        raise Exception(f"LLM response did not match schema: {str(e)}")
 
 
 def extract_with_rules(text: str) -> ExtractedData:
@@ -43,25 +53,28 @@ def extract_with_rules(text: str) -> ExtractedData:
     Returns:
         ExtractedData object with extracted fields
     """
+    hits = _find_rule_hits(text)
+    text_lower = text.lower()
+    
     data = {
-        "doc_type": _extract_doc_type(text),
-        "vendor": _extract_vendor(text),
-        "invoice_number": _extract_invoice_number(text),
-        "invoice_date": _extract_date(text),
-        "total_amount": _extract_total(text),
-        "currency": _extract_currency(text),
+        "doc_type": _extract_doc_type(text_lower, hits),
+        "vendor": _extract_vendor(text, hits),
+        "invoice_number": _extract_invoice_number(hits),
+        "invoice_date": _extract_date(hits),
+        "total_amount": _extract_total(hits),
+        "currency": _extract_currency(text_lower),
         "line_items": []
     }
     
     return ExtractedData(**data)
 
 
-def _build_extraction_prompt(text: str) -> str:
-    """Build a prompt for the LLM to extract structured data."""
-    return f"""You are a document parser. Extract structured information from the following document text and return ONLY valid JSON with no additional explanation.
+# Static instructions sent as the system message. Keeping them byte-identical
+# across requests lets the server reuse the cached KV state for this prefix.
+_SYSTEM_PROMPT = """You are a document parser. Extract structured information from the document text provided by the user and return ONLY valid JSON with no additional explanation.
 
 Required JSON structure:
-{{
+{
   "doc_type": "invoice|receipt|contract|other",
   "vendor": "vendor/company name or null",
   "invoice_number": "invoice/document number or null",
@@ -69,22 +82,79 @@ Required JSON structure:
   "total_amount": numeric value or null,
   "currency": "USD|EUR|GBP|etc or null",
   "line_items": [
-    {{"description": "item description", "quantity": number or null, "unit_price": number or null, "total": number or null}}
+    {"description": "item description", "quantity": number or null, "unit_price": number or null, "total": number or null}
   ]
-}}
+}"""
+
+
+# Passed to the backend so sampling is constrained to valid output
+_RESPONSE_SCHEMA = ExtractedData.model_json_schema()
+
 
-Document text:
-{text[:3000]}
+# Document text budget per prompt; pre-fill cost grows with prompt length
+_MAX_PROMPT_CHARS = 3000
+
+# Lines repeated more often than this (page headers/footers) are kept once
+_MAX_LINE_REPEATS = 3
+
+
+def _build_extraction_prompt(text: str) -> str:
+    """Build the per-document user message sent after the system prompt."""
+    return f"""Document text:
+{_condense_text(text)}
 
 Return only the JSON object:"""
 
 
-def _call_ollama(prompt: str) -> str:
+def _condense_text(text: str) -> str:
+    """
+    Fit document text into the prompt budget.
+    
+    Text that already fits is passed through untouched. Longer text first
+    drops repeats of lines that occur more than _MAX_LINE_REPEATS times,
+    which in multi-page documents are usually headers and footers, so more
+    real content survives the final cut.
+    
+    Args:
+        text: Cleaned document text
+        
+    Returns:
+        Text of at most _MAX_PROMPT_CHARS characters
+    """
+    if len(text) <= _MAX_PROMPT_CHARS:
+        return text
+    
+    lines = text.split('\n')
+    counts = Counter(lines)
+    
+    if any(count > _MAX_LINE_REPEATS for count in counts.values()):
+        seen = set()
+        kept = []
+        for line in lines:
+            if counts[line] > _MAX_LINE_REPEATS:
+                if line in seen:
+                    continue
+                seen.add(line)
+            kept.append(line)
+        text = '\n'.join(kept)
+    
+    return text[:_MAX_PROMPT_CHARS]
+
+
+def _build_messages(prompt: str) -> List[Dict[str, str]]:
+    """Build chat messages with the shared system prompt first."""
+    return [
+        {"role": "system", "content": _SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+async def _call_llm(prompt: str) -> str:
     """
-    Call Ollama API to generate a response.
+    Send a per-document prompt to the configured LLM backend.
     
     Args:
-        prompt: The prompt to send to Ollama
+        prompt: The per-document user message
         
     Returns:
         Generated text response
@@ -92,69 +162,173 @@ def _call_ollama(prompt: str) -> str:
     Raises:
         Exception: If API call fails
     """
-    url = f"{settings.ollama_base_url}/api/generate"
+    return await get_backend().chat(_build_messages(prompt), _RESPONSE_SCHEMA)
+
+
+async def warm_up_llm():
+    """
+    Load the model and prime the server's cache with the system prompt.
     
-    payload = {
-        "model": settings.ollama_model,
-        "prompt": prompt,
-        "stream": False,
-        "format": "json"
-    }
+    Sends a one-token request so the first real document doesn't pay for
+    model loading or system prompt pre-fill. Failures are reported but
+    not raised, since the LLM server may simply not be running yet.
+    """
+    try:
+        await get_backend().chat(_build_messages(""), _RESPONSE_SCHEMA, max_tokens=1)
+    except Exception as e:
+        logger.warning("LLM warm-up failed: %s", e)
+
+
+# Prompts from concurrent requests are grouped before hitting the server
+_batcher = PromptBatcher(
+    _call_llm,
+    batch_size=settings.llm_batch_size,
+    timeout=settings.llm_batch_timeout_ms / 1000
+)
+
+
+# Rules-based extraction helpers
+
+# Every pattern the rules extractor uses, compiled once at import.
+# IGNORECASE replaces lowercasing the text before matching.
+_RULE_PATTERNS = {
+    "item_count": re.compile(r'\d+x\s+[A-Za-z]'),
+    "item_keyword": re.compile(r'quantity|qty|items', re.IGNORECASE),
+    "vendor_label": re.compile(r"(?:from|vendor|seller):\s*([A-Z][A-Za-z\s&.,]+?)(?:\n|$)", re.MULTILINE | re.IGNORECASE),
+    # Optional "No."/"Number"/"#" label on the same line, and a value with
+    # at least one digit, so a bare "INVOICE" header doesn't capture the
+    # word after it
+    "invoice_number": re.compile(r"\binvoice[ \t]*(?:no\.?|number|num\.?|#)?[ \t]*[:\-]?[ \t]*([A-Z0-9-]*\d[A-Z0-9-]*)", re.IGNORECASE),
+    "hash_number": re.compile(r"#\s*([0-9]{4,})"),
+    "date_iso": re.compile(r"(\d{4}-\d{2}-\d{2})"),  # YYYY-MM-DD
+    "date_us": re.compile(r"(\d{2}/\d{2}/\d{4})"),  # MM/DD/YYYY
+    "date_eu": re.compile(r"(\d{2}-\d{2}-\d{4})"),  # DD-MM-YYYY
+    "total": re.compile(r"total:?\s*\$?\s*([\d,]+\.?\d*)", re.IGNORECASE),
+    "amount": re.compile(r"amount:?\s*\$?\s*([\d,]+\.?\d*)", re.IGNORECASE),
+}
+
+_RE_VENDOR_LINE = re.compile(r'^[A-Z][A-Za-z\s&.,]{2,40}$')
+
+
+class _RuleHits(dict):
+    """
+    First match of each rules pattern in a text, searched on demand.
+    
+    Each pattern scans the text at most once, and only when a field
+    helper asks for it, so no pattern is searched twice and unused
+    heuristics never run.
+    """
+    
+    def __init__(self, text: str):
+        super().__init__()
+        self.text = text
+    
+    def __missing__(self, name: str) -> Optional[re.Match]:
+        match = _RULE_PATTERNS[name].search(self.text)
+        self[name] = match
+        return match
+
+
+def _build_rules_database():
+    """Compile every rules pattern into one Hyperscan database, if available."""
+    if hyperscan is None:
+        return None
+    
+    expressions, flags = [], []
+    for pattern in _RULE_PATTERNS.values():
+        pattern_flags = hyperscan.HS_FLAG_SOM_LEFTMOST
+        if pattern.flags & re.IGNORECASE:
+            pattern_flags |= hyperscan.HS_FLAG_CASELESS
+        if pattern.flags & re.MULTILINE:
+            pattern_flags |= hyperscan.HS_FLAG_MULTILINE
+        expressions.append(pattern.pattern.encode("utf-8"))
+        flags.append(pattern_flags)
     
+    database = hyperscan.Database()
     try:
-        response = requests.post(url, json=payload, timeout=60)
-        response.raise_for_status()
-        
-        result = response.json()
-        return result.get("response", "")
-    except requests.exceptions.RequestException as e:
-        raise Exception(f"Ollama API call failed: {str(e)}")
+        database.compile(
+            expressions=expressions,
+            ids=list(range(len(expressions))),
+            flags=flags,
+        )
+    except hyperscan.error:
+        return None
+    
+    return database
+
 
+_RULES_DB = _build_rules_database()
 
-def _parse_json_response(response: str) -> Dict[str, Any]:
+
+def _find_rule_hits(text: str) -> Dict[str, Optional[re.Match]]:
     """
-    Parse JSON from LLM response.
+    Find the first match of every rules pattern in text.
+    
+    With Hyperscan installed, all patterns are matched in a single pass
+    over ASCII text; each pattern is then re-run with `re` only at its
+    first hit to recover capture groups. Otherwise patterns are searched
+    lazily one at a time. Hyperscan's \\s, \\d and caseless matching are
+    ASCII-only while `re` follows Unicode (e.g. a non-breaking space is
+    whitespace), so text with any non-ASCII character always takes the
+    `re` path to keep results identical.
     
     Args:
-        response: LLM generated text
+        text: Cleaned text to scan
         
     Returns:
-        Parsed JSON dictionary
+        Mapping of pattern name to its first match, or None
     """
-    # Try to find JSON in the response
-    json_match = re.search(r'\{.*\}', response, re.DOTALL)
+    if _RULES_DB is None or not text.isascii():
+        return _RuleHits(text)
     
-    if json_match:
-        json_str = json_match.group(0)
-        try:
-            return json.loads(json_str)
-        except json.JSONDecodeError:
-            pass
+    data = text.encode("ascii")
+    first_starts: Dict[int, int] = {}
     
-    # If direct parsing fails, try to clean and parse
-    try:
-        return json.loads(response)
-    except json.JSONDecodeError as e:
-        raise Exception(f"Failed to parse JSON from LLM response: {str(e)}")
+    def on_match(pattern_id, start, end, flags, context):
+        if start < first_starts.get(pattern_id, len(data)):
+            first_starts[pattern_id] = start
+    
+    _RULES_DB.scan(data, match_event_handler=on_match)
+    
+    hits = {}
+    for pattern_id, (name, pattern) in enumerate(_RULE_PATTERNS.items()):
+        start = first_starts.get(pattern_id)
+        if start is None:
+            hits[name] = None
+            continue
+        hits[name] = pattern.search(text, start)
+    
+    return hits
 
 
-# Rules-based extraction helpers
+def _contains_word(text_lower: str, word: str) -> bool:
+    """Check for a whole-word occurrence, with the same boundaries as regex \\b."""
+    start = text_lower.find(word)
+    while start != -1:
+        end = start + len(word)
+        before = text_lower[start - 1] if start else " "
+        after = text_lower[end] if end < len(text_lower) else " "
+        if not (before.isalnum() or before == "_") and not (after.isalnum() or after == "_"):
+            return True
+        start = text_lower.find(word, start + 1)
+    
+    return False
 
-def _extract_doc_type(text: str) -> str:
+
+def _extract_doc_type(text_lower: str, hits: Dict[str, Optional[re.Match]]) -> str:
     """Detect document type from text."""
-    text_lower = text.lower()
-    
-    # Check for explicit document type labels
-    if re.search(r'\binvoice\b', text_lower):
+    # Check for explicit document type labels; literal find() on the
+    # lowercase copy is much cheaper than a case-insensitive regex scan
+    if _contains_word(text_lower, "invoice"):
         return "invoice"
-    elif re.search(r'\breceipt\b', text_lower):
+    elif _contains_word(text_lower, "receipt"):
         return "receipt"
-    elif re.search(r'\bcontract\b|\bagreement\b', text_lower):
+    elif _contains_word(text_lower, "contract") or _contains_word(text_lower, "agreement"):
         return "contract"
     
     # Heuristics: if it has line items and totals, likely an invoice/receipt
-    has_items = bool(re.search(r'\d+x\s+[A-Za-z]', text)) or bool(re.search(r'quantity|qty|items', text_lower))
-    has_total = bool(re.search(r'total:?\s*\$?\s*[\d,]+\.?\d*', text_lower))
+    has_items = bool(hits["item_count"]) or bool(hits["item_keyword"])
+    has_total = bool(hits["total"])
     
     if has_items and has_total:
         return "receipt"
@@ -162,75 +336,49 @@ def _extract_doc_type(text: str) -> str:
     return "other"
 
 
-def _extract_vendor(text: str) -> Optional[str]:
+def _extract_vendor(text: str, hits: Dict[str, Optional[re.Match]]) -> Optional[str]:
     """Extract vendor/company name from text."""
-    lines = text.strip().split('\n')
-    
     # Look for common patterns
-    patterns = [
-        r"(?:from|vendor|seller):\s*([A-Z][A-Za-z\s&.,]+?)(?:\n|$)",
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text, re.MULTILINE | re.IGNORECASE)
-        if match:
-            return match.group(1).strip()
+    match = hits["vendor_label"]
+    if match:
+        return match.group(1).strip()
     
     # Try to get the first meaningful line (skip "INVOICE" or similar headers)
+    lines = text.strip().split('\n', 5)
     for line in lines[:5]:  # Check first 5 lines
         line = line.strip()
         if len(line) > 3 and line.upper() not in ['INVOICE', 'RECEIPT', 'BILL']:
             # Look for company-like names (title case or all caps, reasonable length)
-            if re.match(r'^[A-Z][A-Za-z\s&.,]{2,40}$', line):
+            if _RE_VENDOR_LINE.match(line):
                 return line
     
     return None
 
 
-def _extract_invoice_number(text: str) -> Optional[str]:
+def _extract_invoice_number(hits: Dict[str, Optional[re.Match]]) -> Optional[str]:
     """Extract invoice number from text."""
-    patterns = [
-        r"invoice\s*#?:?\s*([A-Z0-9-]+)",
-        r"invoice\s+number:?\s*([A-Z0-9-]+)",
-        r"#\s*([0-9]{4,})",
-    ]
-    
-    text_lower = text.lower()
-    for pattern in patterns:
-        match = re.search(pattern, text_lower, re.IGNORECASE)
+    for name in ("invoice_number", "hash_number"):
+        match = hits[name]
         if match:
             return match.group(1).strip()
     
     return None
 
 
-def _extract_date(text: str) -> Optional[str]:
+def _extract_date(hits: Dict[str, Optional[re.Match]]) -> Optional[str]:
     """Extract date from text."""
-    patterns = [
-        r"(\d{4}-\d{2}-\d{2})",  # YYYY-MM-DD
-        r"(\d{2}/\d{2}/\d{4})",  # MM/DD/YYYY
-        r"(\d{2}-\d{2}-\d{4})",  # DD-MM-YYYY
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text)
+    for name in ("date_iso", "date_us", "date_eu"):
+        match = hits[name]
         if match:
             return match.group(1)
     
     return None
 
 
-def _extract_total(text: str) -> Optional[float]:
+def _extract_total(hits: Dict[str, Optional[re.Match]]) -> Optional[float]:
     """Extract total amount from text."""
-    patterns = [
-        r"total:?\s*\$?\s*([\d,]+\.?\d*)",
-        r"amount:?\s*\$?\s*([\d,]+\.?\d*)",
-        r"grand\s+total:?\s*\$?\s*([\d,]+\.?\d*)",
-    ]
-    
-    text_lower = text.lower()
-    for pattern in patterns:
-        match = re.search(pattern, text_lower, re.IGNORECASE)
+    for name in ("total", "amount"):
+        match = hits[name]
         if match:
             amount_str = match.group(1).replace(",", "")
             try:
@@ -241,13 +389,15 @@ def _extract_total(text: str) -> Optional[float]:
     return None
 
 
-def _extract_currency(text: str) -> str:
-    """Extract currency from text."""
-    if "$" in text or "usd" in text.lower():
+def _extract_currency(text_lower: str) -> str:
+    """Extract currency from lowercased text."""
+    # Plain substring checks on the shared lowercase copy run far faster
+    # than case-insensitive regex scans of the original text
+    if "$" in text_lower or "usd" in text_lower:
         return "USD"
-    elif "€" in text or "eur" in text.lower():
+    elif "€" in text_lower or "eur" in text_lower:
         return "EUR"
-    elif "£" in text or "gbp" in text.lower():
+    elif "£" in text_lower or "gbp" in text_lower:
         return "GBP"
     else:
         return "USD"  # Default
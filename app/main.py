@@ -1,18 +1,49 @@
 """FastAPI application with document processing endpoints."""
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from typing import List, Optional
-import traceback
 
 from app.config import settings
 from app.schema import DocumentResponse, ExtractedData
-from app.pipeline import process_document
-from app.storage import storage
+from app.pipeline import process_document, hash_document
+from app.llm_extractor import warm_up_llm
+from app.llm_backend import get_backend, close_backend
+from app.storage import get_storage, close_storage
+
+logging.basicConfig(level=settings.log_level.upper())
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open storage and warm up the LLM on startup; release database and LLM connections on shutdown."""
+    get_storage()
+    
+    warm_up = None
+    if settings.extraction_mode == "llm":
+        warm_up = asyncio.create_task(warm_up_llm())
+    
+    yield
+    
+    if warm_up and not warm_up.done():
+        warm_up.cancel()
+    
+    await close_backend()
+    close_storage()
+
 
 app = FastAPI(
     title="Document LLM Pipeline Demo",
     description="PDF document processing with AI-powered structured data extraction",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 
@@ -36,11 +67,15 @@ async def health_check():
     Health check endpoint.
     Returns current configuration and service status.
     """
+    llm_mode = settings.extraction_mode == "llm"
+    backend = get_backend() if llm_mode else None
+    
     return {
         "status": "healthy",
         "mode": settings.extraction_mode,
-        "model": settings.ollama_model if settings.extraction_mode == "llm" else "N/A",
-        "ollama_url": settings.ollama_base_url if settings.extraction_mode == "llm" else "N/A"
+        "backend": backend.name if backend else "N/A",
+        "model": backend.model if backend else "N/A",
+        "llm_url": backend.base_url if backend else "N/A"
     }
 
 
@@ -75,19 +110,27 @@ async def extract_document(
     if mode and mode not in ["llm", "rules"]:
         raise HTTPException(status_code=400, detail="Mode must be 'llm' or 'rules'")
     
+    pdf_path = None
+    content_hash = None
     try:
-        # Read file content
-        pdf_bytes = await file.read()
+        # Spool the upload to disk in chunks rather than reading it into
+        # memory; the copy blocks, so it runs in a worker thread
+        pdf_path = await asyncio.to_thread(_spool_upload, file)
+        # Hashing reads the whole upload, so keep it off the event loop
+        content_hash = await asyncio.to_thread(hash_document, pdf_path)
         
-        # Process through pipeline
-        extracted_data = process_document(pdf_bytes, mode=mode)
+        # Process through pipeline (returns a cached result for repeat uploads)
+        extracted_data = await process_document(
+            pdf_path, mode=mode, content_hash=content_hash
+        )
         
         # Save to storage
-        result = storage.save_document(
+        result = get_storage().save_document(
             filename=file.filename,
             extraction_mode=mode or settings.extraction_mode,
             extracted_data=extracted_data,
-            status="success"
+            status="success",
+            content_hash=content_hash
         )
         
         return result
@@ -95,23 +138,42 @@ async def extract_document(
     except Exception as e:
         # Log error and save failed document
         error_msg = str(e)
-        print(f"Error processing document: {error_msg}")
-        print(traceback.format_exc())
+        logger.exception("Error processing document: %s", error_msg)
         
-        result = storage.save_document(
+        result = get_storage().save_document(
             filename=file.filename,
             extraction_mode=mode or settings.extraction_mode,
             status="failed",
-            error_message=error_msg
+            error_message=error_msg,
+            content_hash=content_hash
         )
         
         raise HTTPException(status_code=500, detail=f"Processing failed: {error_msg}")
+    
+    finally:
+        if pdf_path:
+            os.unlink(pdf_path)
+
+
+def _spool_upload(file: UploadFile) -> str:
+    """Copy an upload to a temporary PDF file and return its path."""
+    tmp = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+    try:
+        with tmp:
+            shutil.copyfileobj(file.file, tmp)
+    except Exception:
+        # The caller never sees the path, so remove the partial file here
+        os.unlink(tmp.name)
+        raise
+    
+    return tmp.name
 
 
 @app.get("/documents", response_model=List[DocumentResponse])
 async def list_documents(
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    include_data: bool = True
 ):
     """
     List processed documents with their metadata and extraction results.
@@ -119,13 +181,18 @@ async def list_documents(
     Args:
         limit: Maximum number of documents to return (default: 100)
         offset: Number of documents to skip for pagination (default: 0)
+        include_data: Include extracted data; false returns metadata only (default: true)
         
     Returns:
         List of DocumentResponse objects
     """
     try:
-        documents = storage.get_documents(limit=limit, offset=offset)
-        return documents
+        # Rows are already in response shape; returning the response directly
+        # skips re-validating every document through response_model
+        documents = get_storage().get_documents(
+            limit=limit, offset=offset, include_data=include_data
+        )
+        return ORJSONResponse(documents)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve documents: {str(e)}")
 
@@ -142,7 +209,7 @@ async def get_document(doc_id: int):
         DocumentResponse with metadata and extracted data
     """
     try:
-        document = storage.get_document_by_id(doc_id)
+        document = get_storage().get_document_by_id(doc_id)
         
         if not document:
             raise HTTPException(status_code=404, detail=f"Document {doc_id} not found")
@@ -1,23 +1,54 @@
 """Orchestrates the document processing pipeline."""
-from typing import Tuple
+import asyncio
+import hashlib
+import logging
+from typing import Optional, Tuple
 from app.config import settings
 from app.schema import ExtractedData
 from app.ingest import extract_text_from_pdf
 from app.llm_extractor import extract_with_llm, extract_with_rules
+from app.storage import get_storage
 
+logger = logging.getLogger(__name__)
 
-def process_document(pdf_bytes: bytes, mode: str = None) -> ExtractedData:
+
+def hash_document(pdf_path: str) -> str:
+    """
+    Compute the SHA-256 digest of a PDF file's contents.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        
+    Returns:
+        Hex-encoded digest, used as the extraction cache key
+    """
+    digest = hashlib.sha256()
+    
+    with open(pdf_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    
+    return digest.hexdigest()
+
+
+async def process_document(
+    pdf_path: str,
+    mode: str = None,
+    content_hash: Optional[str] = None
+) -> ExtractedData:
     """
     Process a PDF document through the complete pipeline.
     
     Steps:
+    0. Reuse a previous extraction of the same file, if any
     1. Extract text from PDF (with OCR fallback)
     2. Extract structured data using LLM or rules
     3. Validate with Pydantic schema
     
     Args:
-        pdf_bytes: PDF file content as bytes
+        pdf_path: Path to the PDF file
         mode: Extraction mode ("llm" or "rules"). Uses config default if None.
+        content_hash: Digest from hash_document(); enables the cache lookup
         
     Returns:
         ExtractedData object with validated structured data
@@ -25,27 +56,40 @@ def process_document(pdf_bytes: bytes, mode: str = None) -> ExtractedData:
     Raises:
         Exception: If any step in the pipeline fails
     """
+    extraction_mode = mode or settings.extraction_mode
+    
+    # Step 0: Cache lookup by content hash
+    if content_hash:
+        # A blocking SQLite query; run it off the event loop too
+        cached = await asyncio.to_thread(
+            get_storage().get_by_hash, content_hash, extraction_mode
+        )
+        if cached:
+            logger.info("Cache hit for %s, skipping extraction", content_hash[:12])
+            return cached
+    
     # Step 1: Text extraction
-    print("Step 1: Extracting text from PDF...")
-    text = extract_text_from_pdf(pdf_bytes)
+    logger.debug("Step 1: Extracting text from PDF...")
+    # PDF parsing and OCR block, so run them off the event loop; other
+    # documents' LLM calls keep progressing in the meantime
+    text = await asyncio.to_thread(extract_text_from_pdf, pdf_path)
     
     if not text or len(text.strip()) < 10:
         raise Exception("Failed to extract sufficient text from PDF")
     
-    print(f"Extracted {len(text)} characters of text")
+    logger.debug("Extracted %d characters of text", len(text))
     
     # Step 2: Structured extraction
-    extraction_mode = mode or settings.extraction_mode
-    print(f"Step 2: Extracting structured data using '{extraction_mode}' mode...")
+    logger.debug("Step 2: Extracting structured data using '%s' mode...", extraction_mode)
     
     if extraction_mode == "llm":
-        extracted_data = extract_with_llm(text)
+        extracted_data = await extract_with_llm(text)
     elif extraction_mode == "rules":
         extracted_data = extract_with_rules(text)
     else:
         raise ValueError(f"Invalid extraction mode: {extraction_mode}")
     
     # Step 3: Validation (already done by Pydantic in extract_with_* functions)
-    print("Step 3: Validation complete")
+    logger.debug("Step 3: Validation complete")
     
     return extracted_data
@@ -1,6 +1,7 @@
 """Pydantic schemas for data validation."""
-from typing import Optional, List
+from typing import ClassVar, Optional, List, Union
 from datetime import datetime
+import orjson
 from pydantic import BaseModel, Field, field_validator
 
 
@@ -14,6 +15,10 @@ class LineItem(BaseModel):
 
 class ExtractedData(BaseModel):
     """Schema for structured data extracted from a document."""
+    # Stored with every extraction; bump when fields change incompatibly so
+    # rows written under an older schema are revalidated when read
+    SCHEMA_VERSION: ClassVar[int] = 1
+    
     doc_type: str = Field(..., description="Document type (e.g., invoice, receipt, contract)")
     vendor: Optional[str] = None
     invoice_number: Optional[str] = None
@@ -29,6 +34,28 @@ class ExtractedData(BaseModel):
         if not v or not v.strip():
             raise ValueError("doc_type cannot be empty")
         return v.strip()
+    
+    @classmethod
+    def from_trusted_json(cls, data: Union[str, bytes]) -> "ExtractedData":
+        """
+        Build an instance from JSON this application serialized itself.
+        
+        Skips validation entirely, so only use it for payloads that were
+        validated before they were stored; untrusted input should go
+        through model_validate_json instead.
+        
+        Args:
+            data: JSON produced by model_dump_json()
+            
+        Returns:
+            ExtractedData built without validation
+        """
+        payload = orjson.loads(data)
+        line_items = [
+            LineItem.model_construct(**item)
+            for item in payload.pop("line_items", None) or []
+        ]
+        return cls.model_construct(line_items=line_items, **payload)
 
 
 class DocumentMetadata(BaseModel):
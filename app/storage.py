@@ -1,16 +1,45 @@
 """SQLite storage for documents and extractions."""
 import json
+import logging
 import os
-from datetime import datetime
-from typing import List, Optional, Dict, Any
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime
+import threading
+import orjson
+import zstandard
+from cachetools import LRUCache
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import List, Optional, Dict, Any, Set, Tuple
+from sqlalchemy import bindparam, create_engine, event, func, insert, inspect, select, text, Column, Index, Integer, LargeBinary, String, Text, DateTime
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.orm import scoped_session, sessionmaker, Session
 from app.config import settings
 from app.schema import DocumentMetadata, ExtractedData, DocumentResponse
+from app.fast_schema import encode_extracted, pretty_json
+
+logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
+# Applied to every new pooled connection. WAL turns commits into sequential
+# appends and lets readers run alongside a writer; synchronous=NORMAL is
+# durable across application crashes in WAL mode and skips most fsyncs.
+_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune a freshly opened SQLite connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in _SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
 
 class Document(Base):
     """SQLAlchemy model for documents table."""
@@ -18,11 +47,72 @@ class Document(Base):
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     filename = Column(String(255), nullable=False)
-    upload_date = Column(DateTime, default=datetime.utcnow)
+    # Generated by SQLite (UTC, millisecond precision) and handed back by
+    # RETURNING. The expression is also rendered inline into every INSERT,
+    # so tables created before the server default existed still get it.
+    upload_date = Column(
+        DateTime,
+        default=func.strftime("%Y-%m-%d %H:%M:%f", "now"),
+        server_default=text("(strftime('%Y-%m-%d %H:%M:%f', 'now'))"),
+        nullable=False
+    )
     extraction_mode = Column(String(50), nullable=False)
     status = Column(String(50), default="success")
     error_message = Column(Text, nullable=True)
-    extracted_json = Column(Text, nullable=True)
+    # zstd-compressed JSON; see _pack_json()
+    extracted_json = Column(LargeBinary, nullable=True)
+    content_hash = Column(String(64), nullable=True, index=True)
+    # ExtractedData.SCHEMA_VERSION the JSON was validated against; NULL for
+    # rows saved before versions were recorded
+    schema_version = Column(Integer, nullable=True)
+    
+    # Lets get_documents walk the newest rows in index order instead of
+    # sorting the whole table, ties on upload_date included
+    __table_args__ = (
+        Index("ix_documents_upload_date_id_desc", upload_date.desc(), id.desc()),
+    )
+    
+    # Fetch server-generated values with RETURNING during flush rather than
+    # with a follow-up SELECT when they're first read
+    __mapper_args__ = {"eager_defaults": True}
+
+
+def _pack_json(data: bytes) -> bytes:
+    """Compress encoded JSON for storage."""
+    # The module-level helpers use a fresh context per call, so they are
+    # safe from the request, worker and file-writer threads alike
+    return zstandard.compress(data, 3)
+
+
+def _unpack_json(blob: bytes) -> bytes:
+    """Decompress a stored extracted_json value back to JSON bytes."""
+    return zstandard.decompress(blob)
+
+
+# Columns that make up DocumentMetadata
+_METADATA_COLUMNS = (
+    Document.id,
+    Document.filename,
+    Document.upload_date,
+    Document.extraction_mode,
+    Document.status,
+    Document.error_message,
+)
+
+# Lookups built once with bound parameters. Every call then presents the
+# same statement object, so SQLAlchemy's compiled cache always hits and
+# SQLite reuses the prepared statement on the pooled connection.
+_DOCUMENT_BY_ID = select(
+    *_METADATA_COLUMNS, Document.extracted_json, Document.schema_version
+).where(Document.id == bindparam("doc_id"))
+
+_LATEST_BY_HASH = select(
+    Document.id, Document.extracted_json, Document.schema_version
+).where(
+    Document.content_hash == bindparam("content_hash"),
+    Document.extraction_mode == bindparam("extraction_mode"),
+    Document.status == "success"
+).order_by(Document.id.desc()).limit(1)
 
 
 class Storage:
@@ -36,9 +126,140 @@ class Storage:
             os.makedirs(db_dir, exist_ok=True)
         
         # Create engine and session
-        self.engine = create_engine(f"sqlite:///{settings.sqlite_db_path}")
+        # The default pool keeps connections open, so the PRAGMAs run once
+        # per pooled connection rather than once per request. The compiled
+        # statement cache is sized well above this module's query shapes.
+        self.engine = create_engine(
+            f"sqlite:///{settings.sqlite_db_path}",
+            query_cache_size=1200
+        )
+        event.listen(self.engine, "connect", _set_sqlite_pragmas)
         Base.metadata.create_all(self.engine)
-        self.SessionLocal = sessionmaker(bind=self.engine)
+        self._upgrade_schema()
+        
+        # One reusable session per thread; close() after each call only
+        # returns its connection to the pool. Rows stay loaded after commit
+        # so saved attributes can be read without another SELECT.
+        self._session_factory = sessionmaker(bind=self.engine, expire_on_commit=False)
+        self.SessionLocal = scoped_session(self._session_factory)
+        
+        # JSON files are written in the background so saves return as soon
+        # as the row is committed. close() shuts the pool down once queued
+        # writes finish; the executor also runs them before interpreter exit.
+        self._io_pool = ThreadPoolExecutor(max_workers=2)
+        # Done callbacks run on the pool's threads, hence the lock
+        self._pending_writes: Set[Future] = set()
+        self._pending_lock = threading.Lock()
+        
+        # Rows are never updated after they are saved, so lookups by id can
+        # be served from memory. Writes made by another process to the same
+        # database file won't show up here until the entry is evicted.
+        self._doc_cache: LRUCache = LRUCache(maxsize=1024)
+        self._doc_cache_lock = threading.Lock()
+    
+    def open_session(self) -> Session:
+        """
+        Open a standalone session for batched writes.
+        
+        Unlike SessionLocal(), this isn't the shared thread-local session,
+        so other storage calls made while a batch is open can't close it.
+        The caller is responsible for closing it.
+        """
+        return self._session_factory()
+    
+    def flush(self):
+        """Block until all queued JSON file writes have finished."""
+        with self._pending_lock:
+            pending = list(self._pending_writes)
+        wait(pending)
+    
+    def close(self):
+        """Finish file writes, discard sessions and close pooled connections."""
+        # Runs the queued writes and stops the pool's threads
+        self._io_pool.shutdown(wait=True)
+        self.SessionLocal.remove()
+        self.engine.dispose()
+    
+    def _upgrade_schema(self):
+        """Add columns and indexes introduced after the database was created."""
+        table = Document.__table__
+        existing = {col["name"] for col in inspect(self.engine).get_columns(table.name)}
+        
+        with self.engine.begin() as conn:
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=self.engine.dialect)
+                    conn.execute(text(
+                        f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                    ))
+        
+        with self.engine.begin() as conn:
+            # Superseded by ix_documents_upload_date_id_desc
+            conn.execute(text("DROP INDEX IF EXISTS ix_documents_upload_date_desc"))
+        
+        for index in table.indexes:
+            index.create(self.engine, checkfirst=True)
+        
+        self._compress_legacy_json()
+        self._version_legacy_rows()
+    
+    def _compress_legacy_json(self):
+        """Rewrite extracted_json values stored as plain JSON text, once."""
+        with self.engine.begin() as conn:
+            # user_version records that this database has been migrated, so
+            # later startups don't rescan the table
+            if conn.execute(text("PRAGMA user_version")).scalar() >= 1:
+                return
+            
+            legacy = conn.execute(text(
+                "SELECT id, extracted_json FROM documents "
+                "WHERE typeof(extracted_json) = 'text'"
+            )).all()
+            if legacy:
+                conn.execute(
+                    text("UPDATE documents SET extracted_json = :blob WHERE id = :id"),
+                    [
+                        {"id": row.id, "blob": _pack_json(row.extracted_json.encode())}
+                        for row in legacy
+                    ]
+                )
+            conn.execute(text("PRAGMA user_version = 1"))
+    
+    def _version_legacy_rows(self):
+        """Validate extractions saved before schema versions were recorded, once."""
+        with self.engine.begin() as conn:
+            if conn.execute(text("PRAGMA user_version")).scalar() >= 2:
+                return
+            
+            legacy = conn.execute(text(
+                "SELECT id, extracted_json FROM documents "
+                "WHERE schema_version IS NULL AND extracted_json IS NOT NULL"
+            )).all()
+            
+            # Rows that pass are re-encoded and stamped with the current
+            # version, so reads trust them instead of revalidating each time
+            updates = []
+            for row in legacy:
+                try:
+                    data = ExtractedData.model_validate_json(_unpack_json(row.extracted_json))
+                except Exception as e:
+                    logger.warning("Document %s failed validation, left unversioned: %s", row.id, e)
+                    continue
+                updates.append({
+                    "id": row.id,
+                    "blob": _pack_json(encode_extracted(data)),
+                    "version": ExtractedData.SCHEMA_VERSION
+                })
+            
+            if updates:
+                conn.execute(
+                    text(
+                        "UPDATE documents SET extracted_json = :blob, "
+                        "schema_version = :version WHERE id = :id"
+                    ),
+                    updates
+                )
+            conn.execute(text("PRAGMA user_version = 2"))
     
     def save_document(
         self,
@@ -46,7 +267,8 @@ class Storage:
         extraction_mode: str,
         extracted_data: Optional[ExtractedData] = None,
         status: str = "success",
-        error_message: Optional[str] = None
+        error_message: Optional[str] = None,
+        content_hash: Optional[str] = None
     ) -> DocumentResponse:
         """
         Save a processed document to database and JSON file.
@@ -57,93 +279,216 @@ class Storage:
             extracted_data: Extracted structured data
             status: Processing status
             error_message: Error message if processing failed
+            content_hash: SHA-256 of the PDF, used for cache lookups
             
         Returns:
             DocumentResponse with metadata and extracted data
         """
+        values = self._document_values(
+            filename, extraction_mode, extracted_data, status, error_message, content_hash
+        )
         session = self.SessionLocal()
         
         try:
-            # Prepare JSON
-            extracted_json = None
-            if extracted_data:
-                extracted_json = extracted_data.model_dump_json()
-            
-            # Create database record
-            doc = Document(
-                filename=filename,
-                extraction_mode=extraction_mode,
-                status=status,
-                error_message=error_message,
-                extracted_json=extracted_json
-            )
-            
-            session.add(doc)
+            # A single Core INSERT ... RETURNING hands back the generated id
+            # and upload_date without ORM unit-of-work bookkeeping
+            row = session.execute(
+                insert(Document).values(**values).returning(*_METADATA_COLUMNS)
+            ).one()
             session.commit()
-            session.refresh(doc)
             
-            # Save JSON to file if successful
-            if extracted_data and status == "success":
-                self._save_json_file(doc.id, extracted_data)
-            
-            # Build response
-            metadata = DocumentMetadata(
-                id=doc.id,
-                filename=doc.filename,
-                upload_date=doc.upload_date,
-                extraction_mode=doc.extraction_mode,
-                status=doc.status,
-                error_message=doc.error_message
-            )
-            
-            return DocumentResponse(
-                metadata=metadata,
-                extracted_data=extracted_data
-            )
+            return self._finish_saved(row, values["extracted_json"], extracted_data)
             
         finally:
             session.close()
     
-    def get_documents(self, limit: int = 100, offset: int = 0) -> List[DocumentResponse]:
+    def add_document(
+        self,
+        session: Session,
+        filename: str,
+        extraction_mode: str,
+        extracted_data: Optional[ExtractedData] = None,
+        status: str = "success",
+        error_message: Optional[str] = None,
+        content_hash: Optional[str] = None
+    ) -> Document:
+        """
+        Stage a processed document in a caller-managed session.
+        
+        Nothing is written until the caller commits, so many documents can
+        share one transaction; pass the staged rows to commit_documents()
+        to commit them and write their JSON files.
+        
+        Args:
+            session: Session from open_session()
+            filename: Name of the uploaded file
+            extraction_mode: Mode used for extraction ("llm" or "rules")
+            extracted_data: Extracted structured data
+            status: Processing status
+            error_message: Error message if processing failed
+            content_hash: SHA-256 of the PDF, used for cache lookups
+            
+        Returns:
+            The pending Document row
+        """
+        doc = Document(**self._document_values(
+            filename, extraction_mode, extracted_data, status, error_message, content_hash
+        ))
+        
+        session.add(doc)
+        return doc
+    
+    def commit_documents(
+        self,
+        session: Session,
+        staged: List[Tuple[Document, Optional[ExtractedData]]]
+    ) -> List[DocumentResponse]:
+        """
+        Commit documents staged with add_document() in one transaction.
+        
+        Args:
+            session: Session the documents were added to
+            staged: (Document, ExtractedData) pairs returned from add_document()
+            
+        Returns:
+            DocumentResponse for each staged document, in order
+        """
+        session.commit()
+        
+        return [
+            self._finish_saved(doc, doc.extracted_json, extracted_data)
+            for doc, extracted_data in staged
+        ]
+    
+    def _document_values(
+        self,
+        filename: str,
+        extraction_mode: str,
+        extracted_data: Optional[ExtractedData],
+        status: str,
+        error_message: Optional[str],
+        content_hash: Optional[str]
+    ) -> Dict[str, Any]:
+        """Build the column values for a new documents row."""
+        # Prepare JSON through the msgspec mirror, skipping model_dump()
+        extracted_json = None
+        if extracted_data:
+            extracted_json = _pack_json(encode_extracted(extracted_data))
+        
+        return {
+            "filename": filename,
+            "extraction_mode": extraction_mode,
+            "status": status,
+            "error_message": error_message,
+            "extracted_json": extracted_json,
+            "schema_version": ExtractedData.SCHEMA_VERSION if extracted_data else None,
+            "content_hash": content_hash
+        }
+    
+    def _finish_saved(
+        self,
+        doc: Any,
+        extracted_json: Optional[bytes],
+        extracted_data: Optional[ExtractedData]
+    ) -> DocumentResponse:
+        """
+        Write the JSON file for a committed document and build its response.
+        
+        Args:
+            doc: Document, or a row with the _METADATA_COLUMNS attributes
+            extracted_json: Compressed JSON stored for the document
+            extracted_data: Extracted structured data
+            
+        Returns:
+            DocumentResponse with metadata and extracted data
+        """
+        # Save JSON to file if successful. The file writer re-indents the
+        # stored JSON, which is much cheaper than rendering the model again.
+        if extracted_data and doc.status == "success":
+            self._queue_json_file(doc.id, extracted_json)
+        
+        # Build response
+        metadata = DocumentMetadata(
+            id=doc.id,
+            filename=doc.filename,
+            upload_date=doc.upload_date,
+            extraction_mode=doc.extraction_mode,
+            status=doc.status,
+            error_message=doc.error_message
+        )
+        
+        response = DocumentResponse(
+            metadata=metadata,
+            extracted_data=extracted_data
+        )
+        
+        with self._doc_cache_lock:
+            self._doc_cache[doc.id] = response
+        
+        return response
+    
+    def get_documents(
+        self,
+        limit: int = 100,
+        offset: int = 0,
+        include_data: bool = True
+    ) -> List[Dict[str, Any]]:
         """
         Retrieve list of processed documents.
         
+        Rows are returned as plain dicts shaped like DocumentResponse. The
+        stored JSON was validated when it was written, so it is decoded
+        without rebuilding Pydantic models for every row.
+        
         Args:
             limit: Maximum number of documents to return
             offset: Number of documents to skip
+            include_data: Whether to load each document's extracted data;
+                metadata-only listings never read the JSON column
             
         Returns:
-            List of DocumentResponse objects
+            List of DocumentResponse-shaped dicts
         """
         session = self.SessionLocal()
         
         try:
-            docs = session.query(Document).order_by(
-                Document.upload_date.desc()
-            ).limit(limit).offset(offset).all()
+            # Plain column rows skip ORM entity and identity-map bookkeeping;
+            # metadata-only listings never read the JSON column at all
+            columns = _METADATA_COLUMNS
+            if include_data:
+                columns += (Document.extracted_json, Document.schema_version)
             
+            # id breaks ties between rows saved in the same millisecond
+            stmt = select(*columns).order_by(
+                Document.upload_date.desc(), Document.id.desc()
+            ).limit(limit).offset(offset).execution_options(yield_per=100)
+            
+            # Rows are fetched from SQLite in chunks of yield_per as we go
             results = []
-            for doc in docs:
-                metadata = DocumentMetadata(
-                    id=doc.id,
-                    filename=doc.filename,
-                    upload_date=doc.upload_date,
-                    extraction_mode=doc.extraction_mode,
-                    status=doc.status,
-                    error_message=doc.error_message
-                )
-                
+            for doc in session.execute(stmt):
                 extracted_data = None
-                if doc.extracted_json:
+                error_message = doc.error_message
+                if include_data and doc.extracted_json:
                     try:
-                        extracted_data = ExtractedData.model_validate_json(doc.extracted_json)
-                    except Exception:
-                        pass
+                        if doc.schema_version == ExtractedData.SCHEMA_VERSION:
+                            # Current-version JSON is already in response shape
+                            extracted_data = orjson.loads(_unpack_json(doc.extracted_json))
+                        else:
+                            extracted_data = self._load_extracted(doc).model_dump(mode="json")
+                    except Exception as e:
+                        error_message = self._decode_failed(doc, e)
                 
-                results.append(DocumentResponse(
-                    metadata=metadata,
-                    extracted_data=extracted_data
-                ))
+                results.append({
+                    "metadata": {
+                        "id": doc.id,
+                        "filename": doc.filename,
+                        "upload_date": doc.upload_date,
+                        "extraction_mode": doc.extraction_mode,
+                        "status": doc.status,
+                        "error_message": error_message
+                    },
+                    "extracted_data": extracted_data
+                })
             
             return results
             
@@ -154,46 +499,142 @@ class Storage:
         """
         Retrieve a specific document by ID.
         
+        Recently saved or fetched documents are answered from an in-memory
+        LRU cache without touching the database.
+        
         Args:
             doc_id: Document ID
             
         Returns:
             DocumentResponse or None if not found
         """
+        with self._doc_cache_lock:
+            cached = self._doc_cache.get(doc_id)
+        if cached is not None:
+            return cached
+        
         session = self.SessionLocal()
         
         try:
-            doc = session.query(Document).filter(Document.id == doc_id).first()
+            doc = session.execute(_DOCUMENT_BY_ID, {"doc_id": doc_id}).first()
             
             if not doc:
                 return None
             
+            extracted_data = None
+            error_message = doc.error_message
+            if doc.extracted_json:
+                try:
+                    extracted_data = self._load_extracted(doc)
+                except Exception as e:
+                    error_message = self._decode_failed(doc, e)
+            
             metadata = DocumentMetadata(
                 id=doc.id,
                 filename=doc.filename,
                 upload_date=doc.upload_date,
                 extraction_mode=doc.extraction_mode,
                 status=doc.status,
-                error_message=doc.error_message
+                error_message=error_message
             )
             
-            extracted_data = None
-            if doc.extracted_json:
-                try:
-                    extracted_data = ExtractedData.model_validate_json(doc.extracted_json)
-                except Exception:
-                    pass
-            
-            return DocumentResponse(
+            response = DocumentResponse(
                 metadata=metadata,
                 extracted_data=extracted_data
             )
             
+            with self._doc_cache_lock:
+                self._doc_cache[doc_id] = response
+            
+            return response
+            
+        finally:
+            session.close()
+    
+    def get_by_hash(self, content_hash: str, extraction_mode: str) -> Optional[ExtractedData]:
+        """
+        Retrieve the latest successful extraction of a file by content hash.
+        
+        Args:
+            content_hash: SHA-256 of the PDF contents
+            extraction_mode: Mode the cached result must have been produced with
+            
+        Returns:
+            ExtractedData or None if the file hasn't been processed in this mode
+        """
+        session = self.SessionLocal()
+        
+        try:
+            doc = session.execute(_LATEST_BY_HASH, {
+                "content_hash": content_hash,
+                "extraction_mode": extraction_mode
+            }).first()
+            
+            if not doc or not doc.extracted_json:
+                return None
+            
+            try:
+                return self._load_extracted(doc)
+            except Exception as e:
+                # Treat an unreadable cached result as a miss and re-extract
+                self._decode_failed(doc, e)
+                return None
+            
         finally:
             session.close()
     
-    def _save_json_file(self, doc_id: int, extracted_data: ExtractedData):
-        """Save extracted data to a JSON file."""
+    def _load_extracted(self, doc: Any) -> ExtractedData:
+        """
+        Decode a row's stored extraction.
+        
+        JSON written under the current schema version was validated on
+        save and is rebuilt without validation; anything older goes
+        through full validation.
+        
+        Args:
+            doc: Document, or a row with id, schema_version and extracted_json
+            
+        Returns:
+            ExtractedData for the row
+            
+        Raises:
+            Exception: If the stored JSON can't be decoded or validated
+        """
+        raw = _unpack_json(doc.extracted_json)
+        
+        if doc.schema_version == ExtractedData.SCHEMA_VERSION:
+            return ExtractedData.from_trusted_json(raw)
+        
+        logger.warning(
+            "Document %s was stored with schema version %s, validating",
+            doc.id, doc.schema_version
+        )
+        return ExtractedData.model_validate_json(raw)
+    
+    def _decode_failed(self, doc: Any, error: Exception) -> str:
+        """Log an unreadable stored extraction and describe it for the response."""
+        logger.error("Failed to decode extracted data for document %s: %s", doc.id, error)
+        return f"Stored extraction could not be decoded: {str(error)}"
+    
+    def _queue_json_file(self, doc_id: int, extracted_json: bytes):
+        """Write a document's JSON file on the background I/O pool."""
+        future = self._io_pool.submit(self._save_json_file, doc_id, extracted_json)
+        with self._pending_lock:
+            self._pending_writes.add(future)
+        future.add_done_callback(self._json_file_written)
+    
+    def _json_file_written(self, future: Future):
+        """Forget a finished write, logging it if it failed."""
+        with self._pending_lock:
+            self._pending_writes.discard(future)
+        error = future.exception()
+        if error:
+            logger.error("Failed to write JSON file: %s", error)
+    
+    def _save_json_file(self, doc_id: int, extracted_json: bytes):
+        """Save a document's stored extracted data to a pretty-printed JSON file."""
+        pretty = pretty_json(_unpack_json(extracted_json))
+        
         # Ensure output directory exists
         if not os.path.exists(settings.json_output_dir):
             os.makedirs(settings.json_output_dir, exist_ok=True)
@@ -202,10 +643,42 @@ class Storage:
         filename = f"document_{doc_id}.json"
         filepath = os.path.join(settings.json_output_dir, filename)
         
-        # Write JSON
-        with open(filepath, "w") as f:
-            f.write(extracted_data.model_dump_json(indent=2))
+        # Write to a temporary file and rename it into place, so readers
+        # never see a partially written file
+        tmp_path = f"{filepath}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(pretty)
+        os.replace(tmp_path, filepath)
+
+
+# Shared instance, opened on first use so importing this module (tests,
+# `cli.py --help`) doesn't touch the database
+_storage: Optional[Storage] = None
+_storage_lock = threading.Lock()
 
 
-# Singleton instance
-storage = Storage()
+def get_storage() -> Storage:
+    """
+    Return the shared Storage, opening the database on first call.
+    
+    Returns:
+        The process-wide Storage instance
+    """
+    global _storage
+    
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = Storage()
+    
+    return _storage
+
+
+def close_storage():
+    """Close the shared Storage if it was opened; the next get_storage() reopens it."""
+    global _storage
+    
+    with _storage_lock:
+        if _storage is not None:
+            _storage.close()
+            _storage = None
@@ -1,59 +1,258 @@
 """CLI tool for processing PDFs."""
 import sys
+import asyncio
 import argparse
+import logging
 from pathlib import Path
-from app.pipeline import process_document
-from app.storage import storage
+from typing import List
+from app.config import settings
+from app.pipeline import process_document, hash_document
+from app.storage import get_storage
+from app.fast_schema import encode_extracted, pretty_json
 
 
 def main():
     """CLI entry point."""
     parser = argparse.ArgumentParser(description="Process PDF documents")
-    parser.add_argument("pdf_file", help="Path to PDF file")
+    parser.add_argument("pdf_files", nargs="+",
+                       help="PDF files or directories of PDFs to process")
     parser.add_argument("--mode", choices=["llm", "rules"], default="llm",
                        help="Extraction mode (default: llm)")
+    parser.add_argument("--batch-size", type=int, default=500,
+                       help="Documents saved per database transaction (default: 500)")
+    parser.add_argument("--concurrency", type=int, default=settings.llm_batch_size,
+                       help="PDFs extracted at once in batch mode (default: LLM_BATCH_SIZE)")
     
     args = parser.parse_args()
     
-    # Read PDF file
-    pdf_path = Path(args.pdf_file)
-    if not pdf_path.exists():
-        print(f"Error: File not found: {pdf_path}")
-        sys.exit(1)
+    logging.basicConfig(level=settings.log_level.upper())
+    
+    pdf_paths = _collect_pdfs(args.pdf_files)
+    
+    if len(pdf_paths) == 1 and Path(args.pdf_files[0]).is_file():
+        _process_single(pdf_paths[0], args.mode)
+    else:
+        failed = asyncio.run(_process_batch(
+            pdf_paths, args.mode, max(args.batch_size, 1), max(args.concurrency, 1)
+        ))
+        if failed:
+            sys.exit(1)
+
+
+def _collect_pdfs(inputs: List[str]) -> List[Path]:
+    """Expand files and directories into a list of PDF paths."""
+    pdf_paths = []
+    
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            pdf_paths.extend(sorted(
+                p for p in path.iterdir() if p.is_file() and p.suffix.lower() == '.pdf'
+            ))
+        elif not path.exists():
+            print(f"Error: File not found: {path}")
+            sys.exit(1)
+        elif not path.suffix.lower() == '.pdf':
+            print(f"Error: File must be a PDF: {path}")
+            sys.exit(1)
+        else:
+            pdf_paths.append(path)
     
-    if not pdf_path.suffix.lower() == '.pdf':
-        print(f"Error: File must be a PDF")
+    if not pdf_paths:
+        print("Error: No PDF files found")
         sys.exit(1)
     
+    return pdf_paths
+
+
+def _process_single(pdf_path: Path, mode: str):
+    """Process one PDF and print its extracted data."""
     print(f"Processing: {pdf_path}")
-    print(f"Mode: {args.mode}")
+    print(f"Mode: {mode}")
     print("-" * 50)
     
     try:
-        # Process document
-        with open(pdf_path, 'rb') as f:
-            pdf_bytes = f.read()
-        
-        extracted_data = process_document(pdf_bytes, mode=args.mode)
+        # Process document (returns a cached result for files seen before)
+        content_hash = hash_document(str(pdf_path))
+        extracted_data = asyncio.run(
+            process_document(str(pdf_path), mode=mode, content_hash=content_hash)
+        )
         
         # Save to storage
-        result = storage.save_document(
+        result = get_storage().save_document(
             filename=pdf_path.name,
-            extraction_mode=args.mode,
+            extraction_mode=mode,
             extracted_data=extracted_data,
-            status="success"
+            status="success",
+            content_hash=content_hash
         )
         
         # Display results
         print("\n✓ Processing complete!")
         print(f"\nDocument ID: {result.metadata.id}")
         print(f"\nExtracted Data:")
-        print(extracted_data.model_dump_json(indent=2))
-        
+        # Same bytes as the JSON file, rendered without a model_dump_json pass
+        print(pretty_json(encode_extracted(extracted_data)).decode())
+    
     except Exception as e:
         print(f"\n✗ Error: {str(e)}")
         sys.exit(1)
 
 
+async def _process_batch(
+    pdf_paths: List[Path],
+    mode: str,
+    batch_size: int,
+    concurrency: int
+) -> int:
+    """
+    Process many PDFs, saving results batch_size at a time.
+    
+    Up to `concurrency` files are extracted at once, so concurrent LLM
+    prompts can be batched together, while a single writer task stages the
+    results and commits each batch in one transaction. Commits run on a
+    worker thread, so extraction carries on while a batch is written.
+    
+    Args:
+        pdf_paths: PDFs to process
+        mode: Extraction mode ("llm" or "rules")
+        batch_size: Documents per transaction
+        concurrency: Maximum number of files extracted at the same time
+    
+    Returns:
+        Number of documents that failed to process
+    """
+    print(f"Processing: {len(pdf_paths)} files")
+    print(f"Mode: {mode}")
+    print("-" * 50)
+    
+    paths: asyncio.Queue = asyncio.Queue()
+    for pdf_path in pdf_paths:
+        paths.put_nowait(pdf_path)
+    
+    # Bounded so finished extractions can't pile up in memory while a
+    # commit is in progress
+    results: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+    
+    extracting = asyncio.gather(*(
+        _extract_worker(paths, results, mode)
+        for _ in range(min(concurrency, len(pdf_paths)))
+    ))
+    writer = asyncio.create_task(_save_results(results, mode, batch_size))
+    
+    await _unless_writer_fails(extracting, writer)
+    await _unless_writer_fails(results.put(None), writer)
+    saved = await writer
+    
+    print(f"\n✓ Processed {saved} of {len(pdf_paths)} files")
+    return len(pdf_paths) - saved
+
+
+async def _unless_writer_fails(awaitable, writer: asyncio.Task):
+    """
+    Wait for awaitable, giving up if the writer task fails first.
+    
+    The writer only finishes before it receives the end-of-results
+    sentinel if a commit raised. Nothing drains the bounded results queue
+    after that, so anything still pending is cancelled and the writer's
+    exception is re-raised instead of waiting forever.
+    
+    Args:
+        awaitable: Extraction workers or the sentinel put
+        writer: Task running _save_results()
+    
+    Raises:
+        Exception: Whatever the writer's commit raised
+    """
+    task = asyncio.ensure_future(awaitable)
+    await asyncio.wait({task, writer}, return_when=asyncio.FIRST_COMPLETED)
+    
+    if not task.done():
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await writer
+    
+    await task
+
+
+async def _extract_worker(paths: asyncio.Queue, results: asyncio.Queue, mode: str):
+    """Extract queued PDFs one after another and hand them to the writer."""
+    while not paths.empty():
+        pdf_path = paths.get_nowait()
+        try:
+            # Hashing reads the whole file, so keep it off the event loop
+            content_hash = await asyncio.to_thread(hash_document, str(pdf_path))
+            extracted_data = await process_document(
+                str(pdf_path), mode=mode, content_hash=content_hash
+            )
+        except Exception as e:
+            print(f"✗ {pdf_path}: {str(e)}")
+            continue
+        
+        await results.put((pdf_path, content_hash, extracted_data))
+
+
+async def _save_results(results: asyncio.Queue, mode: str, batch_size: int) -> int:
+    """
+    Stage extracted documents and commit them batch_size at a time.
+    
+    This is the only task that touches the batch session, and nothing is
+    staged while a commit is running, so the session is never used from
+    two threads at once.
+    
+    Args:
+        results: (path, content hash, ExtractedData) tuples, ended by None
+        mode: Extraction mode the results were produced with
+        batch_size: Documents per transaction
+    
+    Returns:
+        Number of documents saved
+    """
+    storage = get_storage()
+    session = storage.open_session()
+    staged = []
+    saved = 0
+    
+    try:
+        while True:
+            item = await results.get()
+            if item is None:
+                break
+            
+            pdf_path, content_hash, extracted_data = item
+            doc = storage.add_document(
+                session,
+                filename=pdf_path.name,
+                extraction_mode=mode,
+                extracted_data=extracted_data,
+                status="success",
+                content_hash=content_hash
+            )
+            staged.append((pdf_path, doc, extracted_data))
+            
+            if len(staged) >= batch_size:
+                await asyncio.to_thread(_commit_batch, session, staged)
+                saved += len(staged)
+                staged = []
+        
+        if staged:
+            await asyncio.to_thread(_commit_batch, session, staged)
+            saved += len(staged)
+    finally:
+        session.close()
+    
+    return saved
+
+
+def _commit_batch(session, staged):
+    """Commit a batch of staged documents and report their IDs."""
+    results = get_storage().commit_documents(
+        session, [(doc, extracted_data) for _, doc, extracted_data in staged]
+    )
+    
+    for (pdf_path, _, _), result in zip(staged, results):
+        print(f"✓ {pdf_path} -> Document ID {result.metadata.id}")
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,55 @@
+"""Tests for CLI batch processing."""
+import asyncio
+import time
+import pytest
+import cli
+from app.config import settings
+from app.schema import ExtractedData
+from app.storage import Storage
+
+
+@pytest.fixture
+def batch_env(tmp_path, monkeypatch):
+    """Throwaway storage and a stubbed pipeline for two fake PDFs."""
+    monkeypatch.setattr(settings, "sqlite_db_path", str(tmp_path / "documents.db"))
+    monkeypatch.setattr(settings, "json_output_dir", str(tmp_path / "outputs"))
+    store = Storage()
+    monkeypatch.setattr(cli, "get_storage", lambda: store)
+    
+    async def fake_process_document(pdf_path, mode=None, content_hash=None):
+        return ExtractedData(doc_type="invoice", vendor=pdf_path)
+    
+    monkeypatch.setattr(cli, "process_document", fake_process_document)
+    monkeypatch.setattr(cli, "hash_document", lambda pdf_path: pdf_path)
+    
+    yield store, [tmp_path / "a.pdf", tmp_path / "b.pdf"]
+    store.close()
+
+
+def test_process_batch_saves_every_file(batch_env):
+    """Test that batch mode saves each extracted file."""
+    store, paths = batch_env
+    
+    failed = asyncio.run(cli._process_batch(paths, "rules", batch_size=1, concurrency=2))
+    
+    assert failed == 0
+    assert len(store.get_documents()) == 2
+
+
+def test_process_batch_raises_when_a_commit_fails(batch_env, monkeypatch):
+    """Test that a failed commit propagates instead of hanging the pipeline."""
+    _, paths = batch_env
+    
+    def failing_commit(session, staged):
+        # Fail only after the extract workers have finished, while the
+        # results queue is full
+        time.sleep(0.1)
+        raise Exception("disk full")
+    
+    monkeypatch.setattr(cli, "_commit_batch", failing_commit)
+    
+    with pytest.raises(Exception, match="disk full"):
+        asyncio.run(asyncio.wait_for(
+            cli._process_batch(paths, "rules", batch_size=1, concurrency=1),
+            timeout=5
+        ))
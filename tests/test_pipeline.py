@@ -1,7 +1,13 @@
 """Basic tests for the document processing pipeline."""
+import asyncio
 import pytest
 from app.schema import ExtractedData, LineItem
-from app.llm_extractor import extract_with_rules
+from app.fast_schema import ExtractedDataMsg, LineItemMsg, encode_extracted, pretty_json
+from app.llm_extractor import extract_with_rules, _find_rule_hits, _RuleHits, _RULES_DB
+from app.llm_extractor import _condense_text, _contains_word, _MAX_PROMPT_CHARS
+from app.batcher import PromptBatcher
+from app.llm_backend import LlamaCppBackend
+from app.ingest import clean_text
 
 
 def test_schema_validation():
@@ -42,6 +48,40 @@ def test_line_item_schema():
     assert item.quantity == 2.0
 
 
+def test_from_trusted_json_matches_validated_round_trip():
+    """Test that the no-validation read path rebuilds the same model."""
+    data = ExtractedData(
+        doc_type="invoice",
+        vendor="Test Corp",
+        total_amount=100.0,
+        line_items=[LineItem(description="Widget", quantity=2, unit_price=50.0, total=100.0)]
+    )
+    raw = data.model_dump_json()
+    
+    trusted = ExtractedData.from_trusted_json(raw)
+    
+    assert trusted == ExtractedData.model_validate_json(raw)
+    assert isinstance(trusted.line_items[0], LineItem)
+    assert trusted.model_dump_json() == raw
+
+
+def test_fast_schema_mirrors_pydantic_models():
+    """Test that the msgspec mirror encodes exactly like the Pydantic models."""
+    assert ExtractedDataMsg.__struct_fields__ == tuple(ExtractedData.model_fields)
+    assert LineItemMsg.__struct_fields__ == tuple(LineItem.model_fields)
+    
+    data = ExtractedData(
+        doc_type="invoice",
+        vendor="Test Corp",
+        invoice_date="2024-01-01",
+        total_amount=100.0,
+        line_items=[LineItem(description="Widget", quantity=2, unit_price=50.0, total=100.0)]
+    )
+    
+    assert encode_extracted(data) == data.model_dump_json().encode()
+    assert pretty_json(encode_extracted(data)) == data.model_dump_json(indent=2).encode()
+
+
 def test_rules_extractor():
     """Test rules-based extraction."""
     sample_text = """
@@ -61,11 +101,142 @@ def test_rules_extractor():
     
     assert result.doc_type == "invoice"
     assert result.vendor == "Acme Corporation"
-    assert result.invoice_number is not None
+    assert result.invoice_number == "INV-2024-001"
     assert result.invoice_date == "2024-01-15"
     assert result.total_amount == 1000.0
     assert result.currency == "USD"
 
 
+def test_rules_extractor_ignores_invoice_header_without_number():
+    """Test that a bare INVOICE header isn't mistaken for an invoice number."""
+    result = extract_with_rules("INVOICE\nAcme Corporation\nTotal: $50.00\n")
+    
+    assert result.doc_type == "invoice"
+    assert result.invoice_number is None
+
+
+@pytest.mark.skipif(_RULES_DB is None, reason="hyperscan not installed")
+def test_hyperscan_hits_match_regex_hits():
+    """Test that the single-pass Hyperscan scan finds the same hits as re."""
+    samples = [
+        "INVOICE\nAcme Corporation\nInvoice Number: INV-2024-001\nTotal: $1,000.00",
+        "COFFEE SHOP\n2x Cappuccino $8.00\nTOTAL $17.01\nDate: 01/30/2024",
+        # Labels at the very end, with no trailing newline
+        "Receipt 15-01-2024\nAmount: 42\nVendor: Acme Supply",
+        "Invoice #: 12345",
+        "INVOICE\nAcme",
+        "INVOICE\r\nFrom: Acme Corp\r\nInvoice No. A-77\r\nTotal: $1,234.50\r\n",
+    ]
+    
+    for text in samples:
+        fast = _find_rule_hits(text)
+        slow = _RuleHits(text)
+        assert not isinstance(fast, _RuleHits)
+        for name, match in fast.items():
+            expected = slow[name]
+            assert (match and match.group(0)) == (expected and expected.group(0))
+            assert (match and match.start()) == (expected and expected.start())
+
+
+def test_non_ascii_text_uses_regex_hits():
+    """Test that text Hyperscan can't match like re falls back to re."""
+    # Non-breaking spaces are common in PDF text layers
+    text = "ACME SUPPLY CO\nVendor:\xa0Acme Supply\nTotal:\xa0$1,234.50"
+    
+    assert isinstance(_find_rule_hits(text), _RuleHits)
+    
+    result = extract_with_rules(text)
+    assert result.vendor == "Acme Supply"
+    assert result.total_amount == 1234.5
+
+
+def test_contains_word_respects_word_boundaries():
+    """Test that keyword detection only matches whole words."""
+    assert _contains_word("invoice #42", "invoice")
+    assert _contains_word("tax invoice:", "invoice")
+    assert _contains_word("reinvoiced, then invoice", "invoice")
+    assert not _contains_word("invoices", "invoice")
+    assert not _contains_word("invoice_number", "invoice")
+
+
+def test_clean_text():
+    """Test that lines are trimmed and blank lines dropped."""
+    raw = "  INVOICE \r\n\n\t Acme  Corp\t\n   \n\nTotal:  $5  \n"
+    
+    assert clean_text(raw) == "INVOICE\nAcme  Corp\nTotal:  $5"
+
+
+def test_condense_text_drops_repeated_headers():
+    """Test that long text loses repeated page headers before truncation."""
+    short = "ACME CORP\nPage header\nPage header\nPage header\nPage header"
+    assert _condense_text(short) == short
+    
+    page = "ACME CORP - Confidential\n" + "Line item\n" * 2 + "Total: $5"
+    long_text = "\n".join(f"{page} {n}" for n in range(400))
+    condensed = _condense_text(long_text)
+    
+    assert len(condensed) <= _MAX_PROMPT_CHARS
+    assert condensed.count("ACME CORP - Confidential") == 1
+    assert "Total: $5 10" in condensed
+
+
+def test_prompt_batcher_groups_concurrent_prompts():
+    """Test that prompts submitted together are dispatched as one batch."""
+    batches = []
+    
+    async def send(prompt):
+        if prompt == "bad":
+            raise ValueError("boom")
+        return prompt.upper()
+    
+    async def run():
+        batcher = PromptBatcher(send, batch_size=2, timeout=0.01)
+        dispatch = batcher._dispatch
+        
+        async def record_dispatch(batch):
+            batches.append([prompt for prompt, _ in batch])
+            await dispatch(batch)
+        
+        batcher._dispatch = record_dispatch
+        return await asyncio.gather(
+            batcher.submit("a"), batcher.submit("bad"), batcher.submit("c"),
+            return_exceptions=True
+        )
+    
+    results = asyncio.run(run())
+    
+    assert results[0] == "A"
+    assert isinstance(results[1], ValueError)
+    assert results[2] == "C"
+    assert batches == [["a", "bad"], ["c"]]
+
+
+def test_prompt_batcher_dispatches_full_batch_early():
+    """Test that a full batch goes out without waiting out the window."""
+    async def send(prompt):
+        return prompt.upper()
+    
+    async def run():
+        batcher = PromptBatcher(send, batch_size=2, timeout=30)
+        return await asyncio.wait_for(
+            asyncio.gather(batcher.submit("a"), batcher.submit("b")), timeout=1
+        )
+    
+    assert asyncio.run(run()) == ["A", "B"]
+
+
+def test_llamacpp_payload_constrains_output():
+    """Test that llama.cpp requests carry the schema and reuse the prompt cache."""
+    backend = LlamaCppBackend("http://localhost:8080/", "llama3")
+    messages = [{"role": "user", "content": "hi"}]
+    payload = backend._build_payload(messages, {"type": "object"}, 1)
+    
+    assert backend.base_url == "http://localhost:8080"
+    assert payload["response_format"] == {"type": "json_object", "schema": {"type": "object"}}
+    assert payload["cache_prompt"] is True
+    assert payload["max_tokens"] == 1
+    assert backend._parse_content({"choices": [{"message": {"content": "{}"}}]}) == "{}"
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,123 @@
+"""Tests for SQLite document storage."""
+import sqlite3
+import pytest
+from app.config import settings
+from app.schema import ExtractedData
+from app.storage import Storage
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    """Storage backed by a throwaway database and output directory."""
+    monkeypatch.setattr(settings, "sqlite_db_path", str(tmp_path / "documents.db"))
+    monkeypatch.setattr(settings, "json_output_dir", str(tmp_path / "outputs"))
+    
+    store = Storage()
+    yield store
+    store.close()
+
+
+def test_save_document_returns_generated_fields(storage, tmp_path):
+    """Test that saved documents come back with their id and timestamp."""
+    data = ExtractedData(doc_type="invoice", vendor="Test Corp", total_amount=10.0)
+    
+    result = storage.save_document(
+        filename="invoice.pdf",
+        extraction_mode="rules",
+        extracted_data=data,
+        content_hash="abc123"
+    )
+    
+    assert result.metadata.id is not None
+    assert result.metadata.upload_date is not None
+    storage.flush()
+    sidecar = tmp_path / "outputs" / f"document_{result.metadata.id}.json"
+    assert sidecar.read_text() == data.model_dump_json(indent=2)
+    
+    storage._doc_cache.clear()
+    stored = storage.get_document_by_id(result.metadata.id)
+    assert stored.metadata.upload_date == result.metadata.upload_date
+    assert stored.extracted_data == data
+    assert storage.get_by_hash("abc123", "rules") == data
+    assert storage.get_document_by_id(result.metadata.id) is stored
+
+
+def test_commit_documents_saves_batch(storage):
+    """Test that documents staged in one session are committed together."""
+    session = storage.open_session()
+    try:
+        staged = []
+        for name in ("a.pdf", "b.pdf"):
+            data = ExtractedData(doc_type="receipt")
+            doc = storage.add_document(session, filename=name, extraction_mode="rules", extracted_data=data)
+            staged.append((doc, data))
+        
+        results = storage.commit_documents(session, staged)
+    finally:
+        session.close()
+    
+    assert [r.metadata.filename for r in results] == ["a.pdf", "b.pdf"]
+    assert results[0].metadata.id < results[1].metadata.id
+    assert len(storage.get_documents()) == 2
+    listing = storage.get_documents(include_data=False)
+    assert sorted(d["metadata"]["filename"] for d in listing) == ["a.pdf", "b.pdf"]
+    assert all(d["extracted_data"] is None for d in listing)
+
+
+def test_undecodable_rows_report_an_error(storage):
+    """Test that corrupt stored data is surfaced instead of silently dropped."""
+    result = storage.save_document(
+        filename="invoice.pdf",
+        extraction_mode="rules",
+        extracted_data=ExtractedData(doc_type="invoice")
+    )
+    with storage.engine.begin() as conn:
+        conn.exec_driver_sql("UPDATE documents SET extracted_json = x'00'")
+    storage._doc_cache.clear()
+    
+    stored = storage.get_document_by_id(result.metadata.id)
+    
+    assert stored.extracted_data is None
+    assert "could not be decoded" in stored.metadata.error_message
+    assert "could not be decoded" in storage.get_documents()[0]["metadata"]["error_message"]
+
+
+def test_legacy_json_rows_are_compressed_on_startup(tmp_path, monkeypatch, caplog):
+    """Test that rows stored as plain JSON text are migrated and still readable."""
+    db_path = tmp_path / "legacy.db"
+    data = ExtractedData(doc_type="invoice", vendor="Old Corp")
+    
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE documents (id INTEGER PRIMARY KEY, filename VARCHAR(255) NOT NULL, "
+        "upload_date DATETIME, extraction_mode VARCHAR(50) NOT NULL, status VARCHAR(50), "
+        "error_message TEXT, extracted_json TEXT)"
+    )
+    conn.execute(
+        "INSERT INTO documents (filename, upload_date, extraction_mode, status, extracted_json) "
+        "VALUES ('old.pdf', '2024-01-01 00:00:00.000000', 'rules', 'success', ?)",
+        (data.model_dump_json(),)
+    )
+    conn.commit()
+    conn.close()
+    
+    monkeypatch.setattr(settings, "sqlite_db_path", str(db_path))
+    store = Storage()
+    try:
+        caplog.clear()
+        assert store.get_document_by_id(1).extracted_data == data
+        assert store.get_documents()[0]["extracted_data"] == data.model_dump()
+        # Validated once at startup, so reads no longer revalidate it
+        assert "validating" not in caplog.text
+    finally:
+        store.close()
+    
+    conn = sqlite3.connect(db_path)
+    assert conn.execute(
+        "SELECT typeof(extracted_json), schema_version FROM documents"
+    ).fetchone() == ("blob", ExtractedData.SCHEMA_VERSION)
+    conn.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])